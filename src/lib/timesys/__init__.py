@@ -3,11 +3,7 @@
 
 import logging
 import sys
-from timesys import (
-    core,
-    utilities,
-    vigiles,
-)
+from timesys import core
 
 if sys.version_info >= (3, 8):
     from importlib import metadata
@@ -24,3 +20,9 @@ logger = logging.getLogger(__name__)
 
 # Call timesys.llapi.configure() to finish initializing
 llapi = core.LLAPI()
+
+# Subpackages bind the shared llapi object when imported, so it must exist first
+from timesys import (  # noqa: E402
+    utilities,
+    vigiles,
+)
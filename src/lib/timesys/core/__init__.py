@@ -2,3 +2,4 @@
 # SPDX-License-Identifier: MIT
 
 from .llapi import *
+from .async_llapi import *
@@ -0,0 +1,131 @@
+# SPDX-FileCopyrightText: 2022 Timesys Corporation
+# SPDX-License-Identifier: MIT
+import asyncio
+
+import timesys
+from timesys.core.llapi import _httpx_verify, _json_loads
+
+__all__ = ["AsyncLLAPI"]
+
+
+class AsyncLLAPI:
+    """Coroutine interface for LinuxLink communication
+
+    Requests are signed using the configuration of an existing LLAPI object
+    (by default, the shared timesys.llapi object) and sent with an
+    httpx.AsyncClient. When the "h2" package is available, HTTP/2 is used so
+    that many concurrent requests are multiplexed over a single connection.
+
+    This requires the optional "httpx" package, which can be installed with
+    the "async" extra.
+
+    Parameters
+    ----------
+    llapi : LLAPI, optional
+        The LLAPI object whose configuration is used to prepare requests.
+        Default is the shared timesys.llapi object.
+    """
+
+    def __init__(self, llapi=None):
+        if llapi is None:
+            llapi = timesys.llapi
+        self.llapi = llapi
+        # event loop -> (client, verify_cert setting it was created with)
+        self._clients = {}
+
+    @property
+    def client(self):
+        # Pooled connections belong to the event loop they were opened on, so
+        # each loop gets its own client (e.g. for repeated asyncio.run calls).
+        # A client is also bound to the certificate verification setting it
+        # was created with, so it is rebuilt if that setting changes.
+        verify_cert = self.llapi.verify_cert
+        loop = asyncio.get_running_loop()
+        client, client_verify = self._clients.get(loop, (None, None))
+        if client is None or client_verify != verify_cert:
+            try:
+                import httpx
+            except ImportError:
+                raise Exception("AsyncLLAPI requires the 'httpx' package") from None
+
+            # no timeout, like requests. A timed out upload may still have
+            # been processed by the server, and retrying it would duplicate it.
+            verify = _httpx_verify(verify_cert)
+            try:
+                client = httpx.AsyncClient(http2=True, verify=verify, timeout=None)
+            except ImportError:
+                # "h2" is not installed, fall back to HTTP/1.1
+                client = httpx.AsyncClient(verify=verify, timeout=None)
+
+            # clients of loops which have been closed can't be used again
+            for closed in [other for other in self._clients if other.is_closed()]:
+                del self._clients[closed]
+            self._clients[loop] = (client, verify_cert)
+        return client
+
+    async def aclose(self):
+        """Close the running event loop's client and its connections"""
+        client, _ = self._clients.pop(asyncio.get_running_loop(), (None, None))
+        if client is not None:
+            await client.aclose()
+
+    async def _do_api_call(self, request_dict, json_response):
+        if not self.llapi.configured:
+            raise Exception('LLAPI object is not configured properly') from None
+
+        if self.llapi.dry_run:
+            return request_dict
+
+        try:
+            method = request_dict.pop('method')
+            url = request_dict.pop('url')
+        except KeyError as e:
+            raise Exception('_do_api_call: Missing required key: %s' % e.args[0]) from None
+
+        import httpx
+
+        try:
+            r = await self.client.request(
+                method,
+                url,
+                headers=request_dict.get('headers'),
+                content=request_dict.get('data'),
+            )
+        except httpx.TimeoutException:
+            raise Exception("Connection attempt timed out") from None
+        except httpx.TransportError as e:
+            raise Exception(f"Connection could not be made: {e}") from None
+
+        if r.status_code >= 400:
+            try:
+                e = _json_loads(r.content)    # errors should be JSON responses too,
+            except ValueError:  # but just incase HTML comes back..
+                e = r.status_code
+            raise Exception(f"LinuxLink server returned an error: {e}") from None
+
+        if not json_response:
+            return r.content  # bytes, which may be text or binary file content
+        try:
+            return _json_loads(r.content)
+        except Exception as e:
+            raise Exception(f"_do_api_call: error parsing JSON response: {e}") from None
+
+    async def DELETE(self, resource, data_dict=None, json=True):
+        request = self.llapi._prepare_request('DELETE', resource, data_dict=data_dict)
+        return await self._do_api_call(request, json)
+
+    async def GET(self, resource, data_dict=None, json=True):
+        request = self.llapi._prepare_request('GET', resource, data_dict=data_dict)
+        return await self._do_api_call(request, json)
+
+    async def PATCH(self, resource, data_dict=None, json=True):
+        request = self.llapi._prepare_request('PATCH', resource, data_dict=data_dict)
+        return await self._do_api_call(request, json)
+
+    async def POST(self, resource, data_dict=None, json=True):
+        request = self.llapi._prepare_request('POST', resource, data_dict=data_dict)
+        return await self._do_api_call(request, json)
+
+    async def PUT(self, resource, data_dict=None, json=True):
+        request = self.llapi._prepare_request('PUT', resource, data_dict=data_dict)
+        return await self._do_api_call(request, json)
@@ -1,18 +1,67 @@
 # SPDX-FileCopyrightText: 2022 Timesys Corporation
 # SPDX-License-Identifier: MIT
-import base64
-from collections.abc import Sequence
-import hashlib
+import binascii
+import functools
+import gzip
 import hmac
+import io
 import json
 import logging
-import requests
+import os
+import ssl
+import threading
 import urllib.parse
-import urllib3
 import warnings
 
 import timesys
 
+# orjson is an optional, faster decoder for large responses
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    _json_loads = json.loads
+
+
+def _sort_sequences(obj):
+    # Request data only holds lists/tuples as sequence values, and an exact
+    # type check is much cheaper than an ABC isinstance check
+    if type(obj) in (list, tuple):
+        return sorted(obj)
+    return obj
+
+
+def _append_arg(params, encoded, key, quoted_key, value):
+    # Add a key/value to the plain (signed) and urlencoded args, expanding
+    # sequence values the same way as urlencode(..., doseq=True)
+    value = _sort_sequences(value)
+    if isinstance(value, str) or not hasattr(value, "__len__"):
+        value = (value,)
+    for v in value:
+        v = str(v)
+        params.append(f"{key}={v}")
+        encoded.append(f"{quoted_key}={urllib.parse.quote_plus(v)}")
+
+
+# Request bodies larger than this are gzip compressed, if enabled
+_COMPRESS_MIN_SIZE = 16 * 1024
+
+
+@functools.lru_cache(maxsize=8)
+def _load_json_file(path, mtime_ns):
+    # mtime is part of the cache key so edited files are re-read
+    with open(path, "rb") as f:
+        return _json_loads(f.read())
+
+
+def _httpx_verify(verify_cert):
+    # Convert a verify_cert setting to httpx's "verify" argument. httpx
+    # deprecates passing a CA_BUNDLE path, so an SSL context is made for it.
+    if verify_cert in (None, True, False):
+        return verify_cert is not False
+    if os.path.isdir(verify_cert):
+        return ssl.create_default_context(capath=verify_cert)
+    return ssl.create_default_context(cafile=verify_cert)
+
 
 class LLAPI:
     """Interface for configuration and LinuxLink communication
@@ -51,6 +100,11 @@ class LLAPI:
     log_level : str or int
         Specify the package's default log level.
         Default is "WARNING"
+    compress_requests : bool
+        If True, large request bodies (such as manifest uploads) are sent gzip
+        compressed. If the server does not accept compressed requests, the
+        request is retried uncompressed and compression is not used again for that URL.
+        Default is False.
     """
 
     logger = logging.getLogger(__name__).getChild(__qualname__)
@@ -58,8 +112,7 @@ class LLAPI:
     @staticmethod
     def parse_keyfile(key_file_path):
         try:
-            with open(key_file_path, "r") as key_file:
-                key_info = json.load(key_file)
+            key_info = _load_json_file(key_file_path, os.stat(key_file_path).st_mtime_ns)
         except Exception as e:
             raise Exception("Unable to read key file: %s\n%s" % (key_file_path, e)) from None
 
@@ -74,8 +127,7 @@ class LLAPI:
     @staticmethod
     def parse_dashboard_config(dashboard_config_path):
         try:
-            with open(dashboard_config_path, "r") as dashboard_config:
-                dashboard_config_info = json.load(dashboard_config)
+            dashboard_config_info = _load_json_file(dashboard_config_path, os.stat(dashboard_config_path).st_mtime_ns)
         except Exception as e:
             raise Exception(f"Unable to read dashboard config: {dashboard_config_path}: {e}") from None
 
@@ -94,7 +146,7 @@ class LLAPI:
             "folder_token": folder,
         }
 
-    def __init__(self, key_file_path=None, dashboard_config_path=None, url='https://linuxlink.timesys.com', verify_cert=True, dry_run=False, log_level='WARNING'):
+    def __init__(self, key_file_path=None, dashboard_config_path=None, url='https://linuxlink.timesys.com', verify_cert=True, dry_run=False, log_level='WARNING', compress_requests=False):
         self.log_level = log_level
         self.email = None
         self.key = None
@@ -103,8 +155,14 @@ class LLAPI:
         self.folder_token = None
         self.verify_cert = None  # Note: unconfigured is the same as True
         self.dry_run = None
+        self.compress_requests = None
+        self._session = None
+        self._session_lock = threading.Lock()
+        self._httpx_client = None
+        self._retry_settings = {'total': 5, 'backoff_factor': 0.25}
+        self._compression_unsupported = set()
 
-        self.configure(key_file_path=key_file_path, dashboard_config_path=dashboard_config_path, url=url, verify_cert=verify_cert, dry_run=dry_run, log_level=log_level)
+        self.configure(key_file_path=key_file_path, dashboard_config_path=dashboard_config_path, url=url, verify_cert=verify_cert, dry_run=dry_run, log_level=log_level, compress_requests=compress_requests)
 
     @property
     def version(self):
@@ -121,8 +179,46 @@ class LLAPI:
             "verify_cert": self.verify_cert,
             "dry_run": self.dry_run,
             "log_level": self.log_level,
+            "compress_requests": self.compress_requests,
         }
 
+    @property
+    def email(self):
+        return self._email
+
+    @email.setter
+    def email(self, email):
+        self._email = email
+        # Requests with no args besides the email (e.g. heartbeat) reuse these
+        if email is None:
+            self._email_args = None
+        else:
+            self._email_args = (f"email={email}", f"email={urllib.parse.quote_plus(email)}")
+
+    @property
+    def key(self):
+        return self._key
+
+    @key.setter
+    def key(self, key):
+        self._key = key
+        # The keyed HMAC state is built once and copied per request, so the
+        # key schedule isn't re-derived for every signature
+        if key is None:
+            self._hmac_template = None
+        else:
+            self._hmac_template = hmac.new(key, digestmod="sha256")
+
+    @property
+    def url(self):
+        return self._url
+
+    @url.setter
+    def url(self, url):
+        self._url = url
+        # full request URLs are cached per resource, and depend on the base URL
+        self._url_cache = {}
+
     @property
     def log_level(self):
         return self._log_level
@@ -151,54 +247,280 @@ class LLAPI:
         self._verify_cert = setting
         if self.verify_cert is False:
             self.logger.warning('Insecure requests are enabled. Certificates will not be verified.')
+        # httpx clients are bound to a verify setting, so replace it
+        if getattr(self, '_httpx_client', None) is not None:
+            self.use_httpx_http2(True)
 
-    def _make_msg(self, method, resource, data):
-        def sort_sequences(obj):
-            # String values are Sequences but should not be sorted
-            if isinstance(obj, str) or not isinstance(obj, Sequence):
-                return obj
-            return sorted(obj)
+    @property
+    def session(self):
+        # Created on first use and shared by all requests so connections (and
+        # TLS sessions) to the server are kept alive and reused
+        if self._session is None:
+            import requests
+
+            # several threads may make their first request at once, and only
+            # one of them should create the session
+            with self._session_lock:
+                if self._session is None:
+                    session = requests.Session()
+                    self._mount_adapter(session)
+                    self._session = session
+        return self._session
+
+    def _mount_adapter(self, session):
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        # Transient errors are retried on the pooled connection. Besides
+        # connection errors, only idempotent methods (urllib3's default
+        # allowed methods, which excludes POST) are retried on these statuses,
+        # so e.g. a manifest upload is never sent twice.
+        retry = Retry(
+            status_forcelist=(429, 502, 503, 504),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+            **self._retry_settings,
+        )
+        # pool_maxsize allows concurrent callers (threads) to each hold a
+        # connection to the same host
+        adapter = HTTPAdapter(pool_connections=10, pool_maxsize=32, pool_block=False, max_retries=retry)
+        # close the adapters being replaced so their connection pools aren't left behind
+        replaced = {session.adapters.get(prefix) for prefix in ("https://", "http://")}
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        for old in replaced:
+            if old is not None:
+                old.close()
+
+    def use_httpx_http2(self, enabled=True):
+        """Send requests with an HTTP/2 httpx.Client instead of requests
+
+        With HTTP/2, concurrent requests (e.g. from vigiles.concurrent.map_tokens)
+        are multiplexed over a single connection rather than each needing their
+        own. Requires the optional "httpx[http2]" package, which can be
+        installed with the "http2" extra.
+
+        With this backend, failed connections are retried but error responses
+        are not (see configure_retries), and streamed downloads are buffered
+        in memory.
+
+        Parameters
+        ----------
+        enabled : bool
+            True to use httpx, False to go back to requests
+        """
+        if self._httpx_client is not None:
+            self._httpx_client.close()
+            self._httpx_client = None
+
+        if not enabled:
+            return
 
-        args = sorted((k, sort_sequences(v)) for k, v in data.items())
-        args = urllib.parse.unquote_plus(urllib.parse.urlencode(args, doseq=True))
-        msg = "".join([method, resource, args])
-        return msg.encode("utf-8")
+        try:
+            import httpx
+        except ImportError:
+            raise Exception("HTTP/2 support requires the 'httpx[http2]' package") from None
+
+        transport = httpx.HTTPTransport(
+            http2=True,
+            verify=_httpx_verify(self.verify_cert),
+            retries=self._retry_settings['total'],
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+        )
+        # no timeout, like requests. A timed out upload may still have been
+        # processed by the server, and retrying it would duplicate it.
+        self._httpx_client = httpx.Client(transport=transport, timeout=None)
+
+    def configure_retries(self, total=None, backoff_factor=None):
+        """Configure automatic retries of failed requests
+
+        Connection errors, and responses with status 429, 502, 503 or 504 to
+        requests other than POST, are retried with exponential backoff.
+
+        Parameters
+        ----------
+        total : int, optional
+            Maximum number of retries. 0 disables retries. Default is 5
+        backoff_factor : float, optional
+            Base delay in seconds for the exponential backoff between retries. Default is 0.25
+        """
+        if total is not None:
+            self._retry_settings['total'] = total
+        if backoff_factor is not None:
+            self._retry_settings['backoff_factor'] = backoff_factor
+
+        if self._session is not None:
+            with self._session_lock:
+                self._mount_adapter(self._session)
+        if self._httpx_client is not None:
+            self.use_httpx_http2(True)
 
-    def _create_hmac(self, msg):
-        sig = hmac.digest(self.key, msg, hashlib.sha256)
-        return base64.b64encode(sig)
+    def _make_msg(self, method, resource, data):
+        """Build the HMAC signing message and the urlencoded args in one pass
+
+        Args are sorted by key, and sequence values are sorted too. The
+        signature covers the unquoted form of the args.
+        """
+        if len(data) == 1 and data.get("email") == self.email and self._email_args:
+            params, encoded = self._email_args
+            return "".join([method, resource, params]).encode("utf-8"), encoded
+
+        params = []
+        encoded = []
+        for k, v in sorted(data.items()):
+            k = str(k)
+            _append_arg(params, encoded, k, urllib.parse.quote_plus(k), v)
+
+        msg = "".join([method, resource, "&".join(params)])
+        # The encoded args are returned too so the request URL or body can reuse them
+        return msg.encode("utf-8"), "&".join(encoded)
+
+    def _create_hmac(self, msg, hmac_template=None):
+        if hmac_template is None:
+            hmac_template = self._hmac_template
+        h = hmac_template.copy()
+        h.update(msg)
+        return binascii.b2a_base64(h.digest(), newline=False)
 
     def _prepare_request(self, method, resource, data_dict=None):
         if not self.configured:
             raise Exception('LLAPI object has not been configured.') from None
 
+        # copy rather than adding email to the caller's dict
         if data_dict is None:
-            data_dict = {}
-
-        data_dict['email'] = self.email
-        url = f"{self.url}{resource}"
-        msg = self._make_msg(method, resource, data_dict)
-
+            data_dict = {'email': self.email}
+        else:
+            data_dict = {**data_dict, 'email': self.email}
+        url = self._url_cache.get(resource)
+        if url is None:
+            # resources may contain tokens, so keep the cache from growing unbounded
+            if len(self._url_cache) >= 256:
+                self._url_cache.clear()
+            url = self._url_cache[resource] = f"{self.url}{resource}"
+        msg, query = self._make_msg(method, resource, data_dict)
+        return self._build_request(method, url, msg, query)
+
+    def _build_request(self, method, url, msg, query, hmac_template=None):
         request = {
             'headers': {
-                'X-Auth-Signature': self._create_hmac(msg),
+                'X-Auth-Signature': self._create_hmac(msg, hmac_template),
             },
             'method': method.upper(),
         }
 
         if method.upper() != "POST":
-            args = urllib.parse.urlencode(sorted(data_dict.items()), doseq=True)
-            request["url"] = f"{url}?{args}"
+            request["url"] = f"{url}?{query}"
         else:
+            # Send the already encoded form so requests doesn't encode it again
             request["url"] = url
-            request["data"] = data_dict
+            request["data"] = query.encode("ascii")
+            request["headers"]["Content-Type"] = "application/x-www-form-urlencoded"
 
         if self.dry_run:
             request["hmac_msg"] = msg
 
         return request
 
-    def _do_api_call(self, request_dict, json_response):
+    def make_signer(self, method, resource, keys):
+        """Create a function which prepares requests for a single endpoint
+
+        This is intended for sending requests with an HTTP client other than
+        the one used by this object: the returned request dicts are not sent,
+        only signed. The sorted order of the argument keys and the signing
+        message prefix are computed once, which saves work when the same
+        endpoint is called many times with different values. The current
+        configuration (url, email and key) is captured when the signer is
+        created, so later calls to "configure" don't affect it.
+
+        Parameters
+        ----------
+        method : str
+            HTTP method of the endpoint, e.g. "GET"
+        resource : str
+            Resource path of the endpoint, e.g. "/api/v1/vigiles/cves"
+        keys : list of str
+            Names of the arguments sent with each request. "email" is added automatically.
+
+        Returns
+        -------
+        function
+            sign(values) takes a dict with a value for each key and returns a
+            request dict with the same contents as a dry run: "method", "url",
+            "headers", and "data" for POST requests. An Exception is raised if
+            "values" is missing a key or has keys which were not given.
+        """
+        if not self.configured:
+            raise Exception('LLAPI object has not been configured.') from None
+
+        method = method.upper()
+        prefix = method + resource
+        url = f"{self.url}{resource}"
+        email = self.email
+        hmac_template = self._hmac_template
+        known = set(keys) | {'email'}
+        keys = [(k, urllib.parse.quote_plus(k)) for k in sorted(known)]
+
+        def sign(values):
+            unknown = values.keys() - known
+            if unknown:
+                raise Exception(f"Unexpected values for: {', '.join(sorted(map(str, unknown)))}")
+
+            values = {**values, 'email': email}
+            params = []
+            encoded = []
+            for k, quoted_k in keys:
+                try:
+                    v = values[k]
+                except KeyError:
+                    raise Exception(f"Missing value for '{k}'") from None
+                _append_arg(params, encoded, k, quoted_k, v)
+
+            msg = "".join([prefix, "&".join(params)]).encode("utf-8")
+            return self._build_request(method, url, msg, "&".join(encoded), hmac_template)
+
+        return sign
+
+    def _send(self, method, url, request_dict, stream):
+        if self._httpx_client is not None:
+            return self._send_httpx(method, url, request_dict)
+
+        # requests is imported here rather than at module level since it is
+        # slow to import and not needed until a request is actually sent
+        import requests
+        import urllib3
+
+        try:
+            # only filter the InsecureRequestWarning for our call, rather than globally
+            if self.verify_cert is False:
+                with warnings.catch_warnings():
+                    warnings.simplefilter('ignore', urllib3.exceptions.InsecureRequestWarning)
+                    return self.session.request(method, url, verify=False, stream=stream, **request_dict)
+            return self.session.request(method, url, verify=self.verify_cert, stream=stream, **request_dict)
+        except requests.exceptions.ConnectionError as e:
+            raise Exception(f"Connection could not be made: {e}") from None
+        except requests.exceptions.Timeout:
+            raise Exception("Connection attempt timed out") from None
+
+    def _send_httpx(self, method, url, request_dict):
+        import httpx
+
+        try:
+            r = self._httpx_client.request(
+                method,
+                url,
+                headers=request_dict.get('headers'),
+                content=request_dict.get('data'),
+            )
+        except httpx.TimeoutException:
+            raise Exception("Connection attempt timed out") from None
+        except httpx.TransportError as e:
+            raise Exception(f"Connection could not be made: {e}") from None
+
+        # the response is already read, but callers expecting a stream use r.raw
+        r.raw = io.BytesIO(r.content)
+        return r
+
+    def _do_api_call(self, request_dict, json_response, stream=False):
         if not self.configured:
             raise Exception('LLAPI object is not configured properly') from None
 
@@ -211,38 +533,45 @@ class LLAPI:
         except KeyError as e:
             raise Exception('_do_api_call: Missing required key: %s' % e.args[0]) from None
 
-        try:
-            # only filter the InsecureRequestWarning for our call, rather than globally
-            if self.verify_cert is False:
-                with warnings.catch_warnings():
-                    warnings.simplefilter('ignore', urllib3.exceptions.InsecureRequestWarning)
-                    r = requests.request(method, url, verify=False, **request_dict)
-            else:
-                r = requests.request(method, url, verify=self.verify_cert, **request_dict)
-            r.raise_for_status()
-        except requests.exceptions.HTTPError:
+        data = request_dict.get('data')
+        if (self.compress_requests and data is not None and len(data) > _COMPRESS_MIN_SIZE
+                and self.url not in self._compression_unsupported):
+            compressed_request = {
+                **request_dict,
+                'data': gzip.compress(data),
+                'headers': {**request_dict.get('headers', {}), 'Content-Encoding': 'gzip'},
+            }
+            r = self._send(method, url, compressed_request, stream)
+            if r.status_code == 415:  # Unsupported Media Type
+                self.logger.info('Server does not accept compressed requests. Retrying without compression.')
+                self._compression_unsupported.add(self.url)
+                r.close()  # release the connection before resending
+                r = self._send(method, url, request_dict, stream)
+        else:
+            r = self._send(method, url, request_dict, stream)
+
+        # checked directly so the success path doesn't go through raise_for_status
+        if r.status_code >= 400:
             try:
-                e = r.json()    # errors should be JSON responses too,
+                e = _json_loads(r.content)    # errors should be JSON responses too,
             except ValueError:  # but just incase HTML comes back..
                 e = r.status_code
             raise Exception(f"LinuxLink server returned an error: {e}") from None
-        except requests.exceptions.ConnectionError as e:
-            raise Exception(f"Connection could not be made: {e}") from None
-        except requests.exceptions.Timeout:
-            raise Exception("Connection attempt timed out") from None
-        except Exception:
-            raise
 
         if not json_response:
+            if stream:
+                # file-like object, so large files don't have to be held in memory
+                r.raw.decode_content = True
+                return r.raw
             return r.content  # bytes, which may be text or binary file content
         else:
             try:
-                json_data = r.json()
+                json_data = _json_loads(r.content)
             except Exception as e:
                 raise Exception(f"_do_api_call: error parsing JSON response: {e}") from None
         return json_data
 
-    def configure(self, key_file_path=None, dashboard_config_path=None, url=None, verify_cert=None, dry_run=None, log_level=None):
+    def configure(self, key_file_path=None, dashboard_config_path=None, url=None, verify_cert=None, dry_run=None, log_level=None, compress_requests=None):
         if key_file_path:
             self.email, self.key = self.parse_keyfile(key_file_path)
 
@@ -266,28 +595,31 @@ class LLAPI:
         if log_level is not None:
             self.log_level = log_level
 
+        if compress_requests is not None:
+            self.compress_requests = compress_requests
+
         # email/key/url are required, so consider it unconfigured without them.
         if None in [self.email, self.key, self.url]:
             self.configured = False
         else:
             self.configured = True
 
-    def DELETE(self, resource, data_dict=None, json=True):
+    def DELETE(self, resource, data_dict=None, json=True, stream=False):
         request = self._prepare_request('DELETE', resource, data_dict=data_dict)
-        return self._do_api_call(request, json)
+        return self._do_api_call(request, json, stream=stream)
 
-    def GET(self, resource, data_dict=None, json=True):
+    def GET(self, resource, data_dict=None, json=True, stream=False):
         request = self._prepare_request('GET', resource, data_dict=data_dict)
-        return self._do_api_call(request, json)
+        return self._do_api_call(request, json, stream=stream)
 
-    def PATCH(self, resource, data_dict=None, json=True):
+    def PATCH(self, resource, data_dict=None, json=True, stream=False):
         request = self._prepare_request('PATCH', resource, data_dict=data_dict)
-        return self._do_api_call(request, json)
+        return self._do_api_call(request, json, stream=stream)
 
-    def POST(self, resource, data_dict=None, json=True):
+    def POST(self, resource, data_dict=None, json=True, stream=False):
         request = self._prepare_request('POST', resource, data_dict=data_dict)
-        return self._do_api_call(request, json)
+        return self._do_api_call(request, json, stream=stream)
 
-    def PUT(self, resource, data_dict=None, json=True):
+    def PUT(self, resource, data_dict=None, json=True, stream=False):
         request = self._prepare_request('PUT', resource, data_dict=data_dict)
-        return self._do_api_call(request, json)
+        return self._do_api_call(request, json, stream=stream)
@@ -1,7 +1,7 @@
 # SPDX-FileCopyrightText: 2022 Timesys Corporation
 # SPDX-License-Identifier: MIT
 
-import timesys
+from timesys import llapi as _llapi
 
 
 def heartbeat():
@@ -17,4 +17,4 @@ def heartbeat():
             True if the server accepted the request and was able to respond
     """
     resource = "/api/v1/heartbeat"
-    return timesys.llapi.POST(resource)
+    return _llapi.POST(resource)
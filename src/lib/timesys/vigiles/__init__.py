@@ -2,9 +2,12 @@
 # SPDX-License-Identifier: MIT
 
 from timesys.vigiles import (
+    aio,
+    concurrent,
     cves,
     folders,
     manifests,
     products,
     reports,
 )
+from timesys.vigiles._cache import cache_clear
@@ -0,0 +1,116 @@
+# SPDX-FileCopyrightText: 2022 Timesys Corporation
+# SPDX-License-Identifier: MIT
+
+from collections import OrderedDict
+import copy
+import functools
+import threading
+import time
+
+from timesys import llapi as _llapi
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def cache_clear():
+    """Clear cached results of Vigiles API calls
+
+    Functions which change data on the server, such as uploading or deleting
+    manifests, call this automatically.
+    """
+    with _lock:
+        _cache.clear()
+
+
+def ttl_cache(ttl=60, maxsize=256):
+    """Cache results of a function for "ttl" seconds
+
+    Results are cached per LinuxLink user and per configured product/folder,
+    since those change what the server returns. Nothing is cached in dry run
+    mode. Callers get a copy of the cached value so it can't be modified.
+    """
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _llapi.dry_run:
+                return fn(*args, **kwargs)
+
+            key = (
+                fn.__module__,
+                fn.__qualname__,
+                args,
+                tuple(sorted(kwargs.items())),
+                _llapi.url,
+                _llapi.email,
+                _llapi.product_token,
+                _llapi.folder_token,
+            )
+            try:
+                hash(key)
+            except TypeError:
+                # unhashable arguments can't be cached, and are left for the
+                # function itself to validate
+                return fn(*args, **kwargs)
+
+            now = time.monotonic()
+            with _lock:
+                entry = _cache.get(key)
+            if entry is not None and entry[1] > now:
+                return copy.deepcopy(entry[0])
+
+            result = fn(*args, **kwargs)
+            with _lock:
+                if len(_cache) >= maxsize:
+                    # drop expired entries first, then the oldest if still full
+                    for k in [k for k, v in _cache.items() if v[1] <= now]:
+                        del _cache[k]
+                    if len(_cache) >= maxsize:
+                        del _cache[next(iter(_cache))]
+                _cache[key] = (result, now + ttl)
+            return copy.deepcopy(result)
+
+        return wrapper
+
+    return decorator
+
+
+class SizedLRUCache:
+    """Least recently used cache of bytes values, limited by their total size"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._data[key] = value
+            self._size += len(value)
+            while self._size > self.max_bytes:
+                _, evicted = self._data.popitem(last=False)
+                self._size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._size = 0
+
+
+# Downloaded report files. A report token refers to a snapshot, so its
+# files don't change and entries only need to be dropped to limit memory.
+report_cache = SizedLRUCache(256 * 1024 * 1024)
@@ -0,0 +1,32 @@
+# SPDX-FileCopyrightText: 2022 Timesys Corporation
+# SPDX-License-Identifier: MIT
+
+import contextlib
+import shutil
+
+from timesys import llapi as _llapi
+
+CHUNK_SIZE = 64 * 1024
+
+
+def download_to(resource, data, dest):
+    """GET a file resource and stream it to "dest"
+
+    The response is written in chunks, so the whole file is never held in
+    memory. "dest" may be a path or a binary file object.
+
+    In dry run mode, nothing is written and the request dict is returned.
+    Otherwise "dest" is returned.
+    """
+    result = _llapi.GET(resource, data_dict=data, json=False, stream=True)
+    if _llapi.dry_run:
+        return result
+
+    # closed even if opening or writing "dest" fails, so the connection isn't held
+    with contextlib.closing(result):
+        if hasattr(dest, "write"):
+            shutil.copyfileobj(result, dest, CHUNK_SIZE)
+        else:
+            with open(dest, "wb") as f:
+                shutil.copyfileobj(result, f, CHUNK_SIZE)
+    return dest
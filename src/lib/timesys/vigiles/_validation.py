@@ -0,0 +1,10 @@
+# SPDX-FileCopyrightText: 2022 Timesys Corporation
+# SPDX-License-Identifier: MIT
+
+
+def ensure_str_list(name, value):
+    """Raise an Exception if "value" is not a list of strings"""
+    # exact type checks are cheaper than isinstance, and any() stops at the
+    # first bad item
+    if type(value) is not list or any(type(i) is not str for i in value):
+        raise Exception(f"Parameter '{name}' must be a list of strings") from None
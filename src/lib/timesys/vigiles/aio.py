@@ -0,0 +1,118 @@
+# SPDX-FileCopyrightText: 2022 Timesys Corporation
+# SPDX-License-Identifier: MIT
+"""Coroutine versions of the Vigiles API functions
+
+These take the same parameters and return the same results as the functions
+of the same name in the other vigiles modules, but are sent with a shared
+AsyncLLAPI client so many calls can run concurrently from one event loop:
+
+    await asyncio.gather(*[aio.get_latest_report(t) for t in manifest_tokens])
+
+Requests are signed using the configuration of the shared timesys.llapi
+object. This requires the optional "httpx" package.
+
+Unlike their sync versions, get_manifests, get_report_tokens, get_products
+and get_product_info don't cache their results, so they are always current.
+download_report shares the sync version's cache of report files.
+"""
+
+from timesys import llapi as _llapi
+from timesys.core import AsyncLLAPI
+from timesys.vigiles import cves, folders, manifests, products, reports
+from timesys.vigiles._cache import cache_clear, report_cache
+
+_allapi = AsyncLLAPI(_llapi)
+
+
+async def aclose():
+    """Close the running event loop's client and its connections"""
+    await _allapi.aclose()
+
+
+async def get_cve_info(cve_id, fields=None):
+    """See timesys.vigiles.cves.get_cve_info"""
+    resource, data = cves._build_get_cve_info(cve_id, fields)
+    return await _allapi.GET(resource, data_dict=data)
+
+
+async def search_cves_by_product(cpe_product, version="", ids_only=False):
+    """See timesys.vigiles.cves.search_cves_by_product"""
+    resource, data = cves._build_search_cves_by_product(cpe_product, version, ids_only)
+    return await _allapi.GET(resource, data_dict=data)
+
+
+async def get_folders(product_token=None):
+    """See timesys.vigiles.folders.get_folders"""
+    resource, data = folders._build_get_folders(product_token)
+    return await _allapi.GET(resource, data_dict=data)
+
+
+async def get_manifests():
+    """See timesys.vigiles.manifests.get_manifests"""
+    resource, data = manifests._build_get_manifests()
+    return await _allapi.GET(resource, data_dict=data)
+
+
+async def get_manifest_info(manifest_token, sbom_format=None, file_format=None, sbom_version=None):
+    """See timesys.vigiles.manifests.get_manifest_info"""
+    resource, data = manifests._build_get_manifest_info(manifest_token, sbom_format, file_format, sbom_version)
+    return await _allapi.GET(resource, data_dict=data)
+
+
+async def get_manifest_file(manifest_token, sbom_format=None, file_format=None, sbom_version=None):
+    """See timesys.vigiles.manifests.get_manifest_file"""
+    resource, data = manifests._build_get_manifest_file(manifest_token, sbom_format, file_format, sbom_version)
+    return await _allapi.GET(resource, data_dict=data, json=False)
+
+
+async def rescan_manifest(manifest_token, rescan_only=False, filter_results=False, extra_fields=None):
+    """See timesys.vigiles.manifests.rescan_manifest"""
+    resource, data = manifests._build_rescan_manifest(manifest_token, rescan_only, filter_results, extra_fields)
+    result = await _allapi.POST(resource, data_dict=data)
+    cache_clear()
+    return result
+
+
+async def get_report_tokens(manifest_token):
+    """See timesys.vigiles.manifests.get_report_tokens"""
+    resource, data = manifests._build_get_report_tokens(manifest_token)
+    return await _allapi.GET(resource, data_dict=data)
+
+
+async def get_latest_report(manifest_token, filter_results=False, extra_fields=None):
+    """See timesys.vigiles.manifests.get_latest_report"""
+    resource, data = manifests._build_get_latest_report(manifest_token, filter_results, extra_fields)
+    return await _allapi.GET(resource, data_dict=data)
+
+
+async def get_products():
+    """See timesys.vigiles.products.get_products"""
+    resource, data = products._build_get_products()
+    return await _allapi.GET(resource, data_dict=data)
+
+
+async def get_product_info(product_token=None):
+    """See timesys.vigiles.products.get_product_info"""
+    resource, data = products._build_get_product_info(product_token)
+    return await _allapi.GET(resource, data_dict=data)
+
+
+async def download_report(report_token, format=None, filter_results=False):
+    """See timesys.vigiles.reports.download_report"""
+    resource, data = reports._build_download_report(report_token, format, filter_results)
+    if _llapi.dry_run:
+        return await _allapi.GET(resource, data_dict=data, json=False)
+
+    key = reports._report_cache_key(report_token, format, filter_results)
+    result = report_cache.get(key)
+    if result is None:
+        result = await _allapi.GET(resource, data_dict=data, json=False)
+        report_cache.set(key, result)
+
+    return result
+
+
+async def compare_reports(token_one, token_two, remove_whitelist=False, filter_results=False):
+    """See timesys.vigiles.reports.compare_reports"""
+    resource, data = reports._build_compare_reports(token_one, token_two, remove_whitelist, filter_results)
+    return await _allapi.GET(resource, data_dict=data)
@@ -0,0 +1,56 @@
+# SPDX-FileCopyrightText: 2022 Timesys Corporation
+# SPDX-License-Identifier: MIT
+
+from concurrent.futures import ThreadPoolExecutor
+import functools
+
+
+def _return_exception(fn, token):
+    try:
+        return fn(token)
+    except Exception as e:
+        return e
+
+
+def map_tokens(fn, tokens, max_workers=16, return_exceptions=False, **kwargs):
+    """Call a function for each token concurrently
+
+    Calls are made from a pool of threads, which share the llapi connection
+    pool. This is useful for running one of the package's functions over
+    many tokens, such as getting the latest report for several manifests:
+
+        map_tokens(manifests.get_latest_report, manifest_tokens, filter_results=True)
+
+    Parameters
+    ----------
+    fn : function
+        Function to call. The token is passed as the first argument.
+    tokens : list of str
+        Tokens to call the function with
+    max_workers : int
+        Maximum number of concurrent calls.
+        Default: 16
+    return_exceptions : bool
+        If True, an Exception raised by a call is returned in place of its
+        result, and the other calls still complete. If False, the first one
+        is raised here.
+        Default: False
+    **kwargs
+        Keyword arguments passed to every call
+
+    Returns
+    -------
+    list
+        Result of each call, in the same order as "tokens"
+    """
+
+    tokens = list(tokens)
+    if not tokens:
+        return []
+
+    call = functools.partial(fn, **kwargs)
+    if return_exceptions:
+        call = functools.partial(_return_exception, call)
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(tokens))) as executor:
+        return list(executor.map(call, tokens))
@@ -1,7 +1,21 @@
 # SPDX-FileCopyrightText: 2022 Timesys Corporation
 # SPDX-License-Identifier: MIT
 
-import timesys
+from timesys import llapi as _llapi
+from timesys.vigiles.concurrent import map_tokens
+
+_CVE_BASE = "/api/v1/vigiles/cves/"
+
+
+def _build_get_cve_info(cve_id, fields=None):
+    if not cve_id:
+        raise Exception("cve_id is required")
+
+    resource = _CVE_BASE + cve_id
+    data = {}
+    if fields is not None:
+        data["fields"] = fields
+    return resource, data
 
 
 def get_cve_info(cve_id, fields=None):
@@ -21,15 +35,56 @@ def get_cve_info(cve_id, fields=None):
     dict
          CVE data, optionally filtered to the requested fields
     """
-    if not cve_id:
-        raise Exception("cve_id is required")
+    resource, data = _build_get_cve_info(cve_id, fields)
+    return _llapi.GET(resource, data_dict=data)
 
-    resource = f"/api/v1/vigiles/cves/{cve_id}"
-    data = {}
-    if fields is not None:
-        data["fields"] = fields
 
-    return timesys.llapi.GET(resource, data_dict=data)
+def get_cve_info_bulk(cve_ids, fields=None, max_workers=16):
+    """Get CVE info for several CVE IDs
+
+    Requests are made concurrently over the llapi connection pool, and
+    duplicate IDs are only requested once.
+
+    All IDs are checked before any request is made, and an Exception is
+    raised if one is invalid. A failed request doesn't stop the others. Its
+    Exception is returned in place of its CVE data.
+
+    Parameters
+    ----------
+    cve_ids : list of str
+        Valid CVE IDs
+    fields: list of str, optional
+        Limit cve data returned to given the fields. If none are specified, all are returned.
+        See get_cve_info for valid fields.
+    max_workers : int
+        Maximum number of concurrent requests.
+        Default: 16
+
+    Returns
+    -------
+    dict
+        CVE data for each requested ID, or the Exception raised by requests
+        which failed, keyed by CVE ID
+    """
+    cve_ids = list(dict.fromkeys(cve_ids))
+    for cve_id in cve_ids:
+        _build_get_cve_info(cve_id, fields)
+
+    results = map_tokens(get_cve_info, cve_ids, max_workers=max_workers, return_exceptions=True, fields=fields)
+    return dict(zip(cve_ids, results))
+
+
+def _build_search_cves_by_product(cpe_product, version="", ids_only=False):
+    if not cpe_product:
+        raise Exception('cpe_product is required')
+
+    resource = "/api/v1/vigiles/cves"
+    data = {
+        "product": cpe_product,
+        "version": version,
+        "ids_only": ids_only,
+    }
+    return resource, data
 
 
 def search_cves_by_product(cpe_product, version="", ids_only=False):
@@ -51,13 +106,5 @@ def search_cves_by_product(cpe_product, version="", ids_only=False):
         A list of CVE ids is returned if "ids_only" is true, otherwise a dictionary with CVE identifier keys and description values
     """
 
-    if not cpe_product:
-        raise Exception('cpe_product is required')
-
-    resource = "/api/v1/vigiles/cves"
-    data = {
-        "product": cpe_product,
-        "version": version,
-        "ids_only": ids_only,
-    }
-    return timesys.llapi.GET(resource, data_dict=data)
+    resource, data = _build_search_cves_by_product(cpe_product, version, ids_only)
+    return _llapi.GET(resource, data_dict=data)
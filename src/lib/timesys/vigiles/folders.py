@@ -1,14 +1,30 @@
 # SPDX-FileCopyrightText: 2022 Timesys Corporation
 # SPDX-License-Identifier: MIT
 
-import timesys
+from timesys import llapi as _llapi
 
 
-def get_folders():
+def _build_get_folders(product_token=None):
+    data = {}
+    if product_token is None:
+        product_token = _llapi.product_token
+    if product_token:
+        data["product_token"] = product_token
+
+    resource = "/api/v1/vigiles/folders"
+    return resource, data
+
+
+def get_folders(product_token=None):
     """Get all folders that are owned by the current user.
 
-    If a product token is configured on the llapi object, only folders belonging
-    to that product will be returned.
+    If a product token is passed, or one is configured on the llapi object, only
+    folders belonging to that product will be returned.
+
+    Parameters
+    ----------
+    product_token : str, optional
+        Token of the product to limit results to, instead of the configured one
 
     Returns
     -------
@@ -17,10 +33,5 @@ def get_folders():
             "folder_token", "folder_name", "folder_description", "creation_date", "product_token"
     """
 
-    data = {}
-    product_token = timesys.llapi.product_token
-    if product_token:
-        data["product_token"] = product_token
-
-    resource = "/api/v1/vigiles/folders"
-    return timesys.llapi.GET(resource, data_dict=data)
+    resource, data = _build_get_folders(product_token)
+    return _llapi.GET(resource, data_dict=data)
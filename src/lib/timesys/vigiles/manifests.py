@@ -2,11 +2,36 @@
 # SPDX-License-Identifier: MIT
 
 import logging
-import timesys
+from timesys import llapi as _llapi
+from timesys.vigiles._cache import cache_clear, report_cache, ttl_cache
+from timesys.vigiles._download import download_to
+from timesys.vigiles._validation import ensure_str_list
 
 logger = logging.getLogger(__name__)
 
+_MANIFEST_BASE = "/api/v1/vigiles/manifests/"
 
+
+def _compact(data):
+    # drop optional parameters which were not given
+    return {k: v for k, v in data.items() if v is not None}
+
+
+def _build_get_manifests():
+    resource = "/api/v1/vigiles/manifests"
+    data = {}
+
+    folder_token = _llapi.folder_token
+    product_token = _llapi.product_token
+
+    if folder_token is not None:
+        data["folder_token"] = folder_token
+    elif product_token is not None:
+        data["product_token"] = product_token
+    return resource, data
+
+
+@ttl_cache()
 def get_manifests():
     """Get all manifests that are accessible by the current user
 
@@ -14,6 +39,9 @@ def get_manifests():
     may be provided. If configured on the llapi object, folder token takes
     precedence.
 
+    Results are cached for up to 60 seconds. Call timesys.vigiles.cache_clear()
+    to see changes made elsewhere, such as through the web interface.
+
     Returns
     -------
     list of dict
@@ -32,18 +60,24 @@ def get_manifests():
 
     """
 
-    resource = "/api/v1/vigiles/manifests"
-    data = {}
+    resource, data = _build_get_manifests()
+    return _llapi.GET(resource, data_dict=data)
 
-    folder_token = timesys.llapi.folder_token
-    product_token = timesys.llapi.product_token
 
-    if folder_token is not None:
-        data["folder_token"] = folder_token
-    elif product_token is not None:
-        data["product_token"] = product_token
+def _build_get_manifest_info(manifest_token, sbom_format=None, file_format=None, sbom_version=None):
+    if not manifest_token:
+        raise Exception("manifest_token is required")
+
+    data = {}
+    if sbom_format is not None:
+        data["sbom_format"] = sbom_format
+    if file_format:
+        data["file_format"] = file_format
+    if sbom_version:
+        data["sbom_version"] = sbom_version
 
-    return timesys.llapi.GET(resource, data_dict=data)
+    resource = _MANIFEST_BASE + manifest_token
+    return resource, data
 
 
 def get_manifest_info(manifest_token, sbom_format=None, file_format=None, sbom_version=None):
@@ -77,22 +111,26 @@ def get_manifest_info(manifest_token, sbom_format=None, file_format=None, sbom_v
                 converted due to the "sbom_format" parameter
     """
 
+    resource, data = _build_get_manifest_info(manifest_token, sbom_format, file_format, sbom_version)
+    return _llapi.GET(resource, data_dict=data)
+
+
+def _build_get_manifest_file(manifest_token, sbom_format=None, file_format=None, sbom_version=None):
     if not manifest_token:
         raise Exception("manifest_token is required")
 
-    data = {}
-    if sbom_format is not None:
+    resource = _MANIFEST_BASE + manifest_token
+    data = {'send_file': True}
+    if sbom_format:
         data["sbom_format"] = sbom_format
     if file_format:
         data["file_format"] = file_format
     if sbom_version:
         data["sbom_version"] = sbom_version
-
-    resource = f"/api/v1/vigiles/manifests/{manifest_token}"
-    return timesys.llapi.GET(resource, data_dict=data)
+    return resource, data
 
 
-def get_manifest_file(manifest_token, sbom_format=None, file_format=None, sbom_version=None):
+def get_manifest_file(manifest_token, sbom_format=None, file_format=None, sbom_version=None, dest=None):
     """Get manifest data as a file
 
     Response does not include other metadata such as product/folder tokens.
@@ -104,25 +142,54 @@ def get_manifest_file(manifest_token, sbom_format=None, file_format=None, sbom_v
         Acceptable formats are:
             "spdx"
                 Convert the manifest to SPDX format before returning it
+    dest : str or file object, optional
+        If given, the manifest is streamed to this path or binary file object
+        in chunks instead of being returned, so large files are not held in memory.
 
     Returns
     -------
     bytes
-        The raw manifest file bytes
+        The raw manifest file bytes, or "dest" if it was given
     """
 
-    if not manifest_token:
-        raise Exception("manifest_token is required")
+    resource, data = _build_get_manifest_file(manifest_token, sbom_format, file_format, sbom_version)
+    if dest is not None:
+        return download_to(resource, data, dest)
+    return _llapi.GET(resource, data_dict=data, json=False)
 
-    resource = f"/api/v1/vigiles/manifests/{manifest_token}"
-    data = {'send_file': True}
-    if sbom_format:
-        data["sbom_format"] = sbom_format
-    if file_format:
-        data["file_format"] = file_format
-    if sbom_version:
-        data["sbom_version"] = sbom_version
-    return timesys.llapi.GET(resource, data_dict=data, json=False)
+
+def _build_upload_manifest(manifest, kernel_config=None, uboot_config=None, manifest_name=None, subfolder_name=None, filter_results=False, extra_fields=None, upload_only=False):
+    if not manifest:
+        raise Exception('manifest data is required')
+
+    resource = "/api/v1/vigiles/manifests"
+
+    if extra_fields is not None:
+        ensure_str_list("extra_fields", extra_fields)
+
+    data = _compact({
+        "manifest": manifest,
+        "filter_results": filter_results,
+        "upload_only": upload_only,
+        "kernel_config": kernel_config,
+        "manifest_name": manifest_name,
+        "uboot_config": uboot_config,
+        "subfolder_name": subfolder_name,
+        "with_field": extra_fields,  # llapi sends lists as repeated params
+    })
+
+    product_token = _llapi.product_token
+    folder_token = _llapi.folder_token
+    if folder_token:
+        data["folder_token"] = folder_token
+    if product_token:
+        data["product_token"] = product_token
+    else:
+        logger.warning('No product token is configured. Upload target will be "Private Workspace"')
+
+    if not product_token and (folder_token or subfolder_name):
+        logger.warning('"Private Workspace" does not support folders. Since a product token is not configured, the folder_token and subfolder_name arguments will be ignored.')
+    return resource, data
 
 
 def upload_manifest(manifest, kernel_config=None, uboot_config=None, manifest_name=None, subfolder_name=None, filter_results=False, extra_fields=None, upload_only=False):
@@ -188,47 +255,74 @@ def upload_manifest(manifest, kernel_config=None, uboot_config=None, manifest_na
             The manifest data in SPDX format
     """
 
-    if not manifest:
-        raise Exception('manifest data is required')
+    resource, data = _build_upload_manifest(manifest, kernel_config, uboot_config, manifest_name, subfolder_name, filter_results, extra_fields, upload_only)
+    result = _llapi.POST(resource, data)
+    cache_clear()
+    return result
 
-    resource = "/api/v1/vigiles/manifests"
 
-    data = {
-        "manifest": manifest,
-        "filter_results": filter_results,
-        "upload_only": upload_only,
-    }
+def upload_manifests_batch(manifests, **kwargs):
+    """Upload and scan (optionally) several manifests
 
-    if kernel_config is not None:
-        data["kernel_config"] = kernel_config
+    The manifests are uploaded one at a time over the llapi connection pool,
+    so connection setup is only paid once for the whole batch.
 
-    if manifest_name is not None:
-        data["manifest_name"] = manifest_name
+    The arguments for every manifest are checked before anything is uploaded,
+    and an Exception is raised if any are invalid. A failed upload doesn't
+    stop the batch. Its Exception is returned in place of its result, so the
+    caller can tell which manifests were uploaded and retry only the ones
+    which failed.
 
-    if uboot_config is not None:
-        data["uboot_config"] = uboot_config
-
-    if subfolder_name is not None:
-        data["subfolder_name"] = subfolder_name
+    Parameters
+    ----------
+    manifests : list of str or dict
+        Manifests to upload. Each item is either a string of manifest data, or a
+        dictionary of "upload_manifest" arguments (which must include "manifest")
+        for options specific to that manifest, such as "manifest_name".
+    **kwargs
+        Arguments passed to "upload_manifest" for every manifest, unless
+        overridden by a manifest's dictionary
 
-    if extra_fields is not None:
-        if not isinstance(extra_fields, list) or not all(isinstance(i, str) for i in extra_fields):
-            raise Exception("Parameter 'extra_fields' must be a list of strings") from None
-        data["with_field"] = extra_fields  # will be split into repeated params
+    Returns
+    -------
+    list of dict or Exception
+        Result of each upload, in the same order as "manifests", or the
+        Exception raised by uploads which failed.
+        See "upload_manifest" for details.
+    """
 
-    product_token = timesys.llapi.product_token
-    folder_token = timesys.llapi.folder_token
-    if folder_token:
-        data["folder_token"] = folder_token
-    if product_token:
-        data["product_token"] = product_token
-    else:
-        logger.warning('No product token is configured. Upload target will be "Private Workspace"')
+    requests = []
+    for manifest in manifests:
+        if isinstance(manifest, dict):
+            requests.append(_build_upload_manifest(**{**kwargs, **manifest}))
+        else:
+            requests.append(_build_upload_manifest(manifest, **kwargs))
+
+    results = []
+    for resource, data in requests:
+        try:
+            results.append(_llapi.POST(resource, data))
+        except Exception as e:
+            results.append(e)
+    if results:
+        cache_clear()
+    return results
+
+
+def _build_rescan_manifest(manifest_token, rescan_only=False, filter_results=False, extra_fields=None):
+    if not manifest_token:
+        raise Exception('manifest_token is required')
 
-    if not product_token and (folder_token or subfolder_name):
-        logger.warning('"Private Workspace" does not support folders. Since a product token is not configured, the folder_token and subfolder_name arguments will be ignored.')
+    resource = _MANIFEST_BASE + manifest_token + "/reports"
+    if extra_fields is not None:
+        ensure_str_list("extra_fields", extra_fields)
 
-    return timesys.llapi.POST(resource, data)
+    data = _compact({
+        "rescan_only": rescan_only,
+        "filtered": filter_results,
+        "with_field": extra_fields,  # llapi sends lists as repeated params
+    })
+    return resource, data
 
 
 def rescan_manifest(manifest_token, rescan_only=False, filter_results=False, extra_fields=None):
@@ -272,22 +366,56 @@ def rescan_manifest(manifest_token, rescan_only=False, filter_results=False, ext
         exported_manifest
             The manifest data in SPDX format
     """
-    if not manifest_token:
-        raise Exception('manifest_token is required')
+    resource, data = _build_rescan_manifest(manifest_token, rescan_only, filter_results, extra_fields)
+    result = _llapi.POST(resource, data)
+    cache_clear()
+    return result
 
-    resource = f"/api/v1/vigiles/manifests/{manifest_token}/reports"
-    data = {
-        "manifest": manifest_token,
-        "rescan_only": rescan_only,
-        "filtered": filter_results,
-    }
 
-    if extra_fields is not None:
-        if not isinstance(extra_fields, list) or not all(isinstance(i, str) for i in extra_fields):
-            raise Exception("Parameter 'extra_fields' must be a list of strings") from None
-        data["with_field"] = extra_fields  # will be split into repeated params
+def rescan_manifests(manifest_tokens, **kwargs):
+    """Generate a new report for each of the given manifest tokens
 
-    return timesys.llapi.POST(resource, data)
+    The arguments for every manifest are checked before any rescan is
+    requested, and an Exception is raised if any are invalid. A failed rescan
+    doesn't stop the others. Its Exception is returned in place of its result.
+
+    Parameters
+    ---------
+    manifest_tokens : list of str
+        Tokens for the manifests to rescan
+    **kwargs
+        Arguments passed to "rescan_manifest" for every manifest
+
+    Returns
+    -------
+    list of dict or Exception
+        Result of each scan, in the same order as "manifest_tokens", or the
+        Exception raised by scans which failed.
+        See "rescan_manifest" for details.
+    """
+    requests = [_build_rescan_manifest(manifest_token, **kwargs) for manifest_token in manifest_tokens]
+
+    results = []
+    for resource, data in requests:
+        try:
+            results.append(_llapi.POST(resource, data))
+        except Exception as e:
+            results.append(e)
+    if results:
+        cache_clear()
+    return results
+
+
+def _build_delete_manifest(manifest_token, confirmed=False):
+    if not manifest_token:
+        raise Exception("manifest_token is required")
+
+    if not confirmed:
+        raise Exception("delete_manifest requires confirmed=True to delete the manifest")
+
+    resource = _MANIFEST_BASE + manifest_token
+    data = {"confirmed": confirmed}
+    return resource, data
 
 
 def delete_manifest(manifest_token, confirmed=False):
@@ -300,6 +428,9 @@ def delete_manifest(manifest_token, confirmed=False):
     ---------
     manifest_token : str
         Token of the manifest to be deleted
+    confirmed : bool
+        Must be True, otherwise an Exception is raised and nothing is deleted.
+        Default: False
 
     Returns
     -------
@@ -314,17 +445,29 @@ def delete_manifest(manifest_token, confirmed=False):
     This action can not be undone!
     """
 
+    resource, data = _build_delete_manifest(manifest_token, confirmed)
+    result = _llapi.DELETE(resource, data_dict=data)
+    cache_clear()
+    # which cached reports belong to the manifest isn't known, so drop them all
+    report_cache.clear()
+    return result
+
+
+def _build_get_report_tokens(manifest_token):
     if not manifest_token:
         raise Exception("manifest_token is required")
 
-    resource = f"/api/v1/vigiles/manifests/{manifest_token}"
-    data = {"confirmed": confirmed}
-    return timesys.llapi.DELETE(resource, data_dict=data)
+    resource = _MANIFEST_BASE + manifest_token + "/reports"
+    return resource, {}
 
 
+@ttl_cache()
 def get_report_tokens(manifest_token):
     """Get a list of report_tokens available for the given manifest_token
 
+    Results are cached for up to 60 seconds. Call timesys.vigiles.cache_clear()
+    to see changes made elsewhere, such as through the web interface.
+
     Parameters
     ----------
     manifest_token : str
@@ -338,11 +481,24 @@ def get_report_tokens(manifest_token):
             "created_date", "report_token", "manifest_token", "manifest_version"
     """
 
+    resource, data = _build_get_report_tokens(manifest_token)
+    return _llapi.GET(resource, data_dict=data)
+
+
+def _build_get_latest_report(manifest_token, filter_results=False, extra_fields=None):
     if not manifest_token:
         raise Exception("manifest_token is required")
 
-    resource = f"/api/v1/vigiles/manifests/{manifest_token}/reports"
-    return timesys.llapi.GET(resource)
+    if extra_fields is not None:
+        ensure_str_list("extra_fields", extra_fields)
+
+    data = _compact({
+        'filtered': filter_results,
+        'with_field': extra_fields,  # llapi sends lists as repeated params
+    })
+
+    resource = _MANIFEST_BASE + manifest_token + "/reports/latest"
+    return resource, data
 
 
 def get_latest_report(manifest_token, filter_results=False, extra_fields=None):
@@ -385,17 +541,5 @@ def get_latest_report(manifest_token, filter_results=False, extra_fields=None):
 
     """
 
-    if not manifest_token:
-        raise Exception("manifest_token is required")
-
-    data = {
-        'filtered': filter_results,
-    }
-
-    if extra_fields is not None:
-        if not isinstance(extra_fields, list) or not all(isinstance(i, str) for i in extra_fields):
-            raise Exception("Parameter 'extra_fields' must be a list of strings") from None
-        data["with_field"] = extra_fields  # will be split into repeated params
-
-    resource = f"/api/v1/vigiles/manifests/{manifest_token}/reports/latest"
-    return timesys.llapi.GET(resource, data_dict=data)
+    resource, data = _build_get_latest_report(manifest_token, filter_results, extra_fields)
+    return _llapi.GET(resource, data_dict=data)
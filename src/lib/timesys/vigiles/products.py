@@ -1,12 +1,47 @@
 # SPDX-FileCopyrightText: 2022 Timesys Corporation
 # SPDX-License-Identifier: MIT
 
-import timesys
+from timesys import llapi as _llapi
+from timesys.vigiles._cache import cache_clear, ttl_cache
 
+_PRODUCT_BASE = "/api/v1/vigiles/products/"
 
+
+def _build_get_products():
+    resource = "/api/v1/vigiles/products"
+    return resource, {}
+
+
+def _build_get_product_info(product_token=None):
+    if product_token is None:
+        product_token = _llapi.product_token
+
+    if not product_token:
+        raise Exception('product_token is required either as a parameter or configured on the llapi object')
+
+    resource = _PRODUCT_BASE + product_token
+    return resource, {}
+
+
+def _build_create_product(product_name, product_description=None):
+    if not product_name:
+        raise Exception("product_name is required")
+
+    resource = "/api/v1/vigiles/products"
+    data = {"name": product_name}
+
+    if product_description:
+        data["desc"] = product_description
+    return resource, data
+
+
+@ttl_cache()
 def get_products():
     """Get product info for all products available to the current user
 
+    Results are cached for up to 60 seconds. Call timesys.vigiles.cache_clear()
+    to see changes made elsewhere, such as through the web interface.
+
     Returns
     -------
     list of dict
@@ -14,8 +49,8 @@ def get_products():
             "name", "description", "token"
     """
 
-    resource = "/api/v1/vigiles/products"
-    return timesys.llapi.GET(resource)
+    resource, data = _build_get_products()
+    return _llapi.GET(resource, data_dict=data)
 
 
 def create_product(product_name, product_description=None):
@@ -40,18 +75,13 @@ def create_product(product_name, product_description=None):
             Token of the new product
     """
 
-    if not product_name:
-        raise Exception("product_name is required")
-
-    resource = "/api/v1/vigiles/products"
-    data = {"name": product_name}
-
-    if product_description:
-        data["desc"] = product_description
-
-    return timesys.llapi.POST(resource, data_dict=data)
+    resource, data = _build_create_product(product_name, product_description)
+    result = _llapi.POST(resource, data_dict=data)
+    cache_clear()
+    return result
 
 
+@ttl_cache()
 def get_product_info(product_token=None):
     """Get product information from a product_token
 
@@ -59,6 +89,9 @@ def get_product_info(product_token=None):
     If no token is passed, but a product_token is configured on the llapi object, it will be used.
     If neither are provided, an Exception will be raised.
 
+    Results are cached for up to 60 seconds. Call timesys.vigiles.cache_clear()
+    to see changes made elsewhere, such as through the web interface.
+
     Parameters
     ----------
     product_token : str, optional
@@ -79,11 +112,5 @@ def get_product_info(product_token=None):
             Date that the product was created
     """
 
-    if product_token is None:
-        product_token = timesys.llapi.product_token
-
-    if not product_token:
-        raise Exception('product_token is required either as a parameter or configured on the llapi object')
-
-    resource = f"/api/v1/vigiles/products/{product_token}"
-    return timesys.llapi.GET(resource)
+    resource, data = _build_get_product_info(product_token)
+    return _llapi.GET(resource, data_dict=data)
@@ -1,12 +1,42 @@
 # SPDX-FileCopyrightText: 2022 Timesys Corporation
 # SPDX-License-Identifier: MIT
 
-import timesys
+from timesys import llapi as _llapi
+from timesys.vigiles._cache import report_cache
+from timesys.vigiles._download import download_to
+from timesys.vigiles.concurrent import map_tokens
 
+_REPORT_BASE = "/api/v1/vigiles/reports/"
+_VALID_REPORT_FORMATS = frozenset(("csv", "pdf", "pdfsummary", "xlsx"))
+_VALID_REPORT_FORMATS_MSG = ", ".join(sorted(_VALID_REPORT_FORMATS))
 
-def download_report(report_token, format=None, filter_results=False):
+
+def _build_download_report(report_token, format=None, filter_results=False):
+    if not report_token:
+        raise Exception("report_token is required")
+
+    if format not in _VALID_REPORT_FORMATS:
+        raise Exception("Invalid or missing 'format' arg. "
+                        f"Acceptable values: {_VALID_REPORT_FORMATS_MSG}")
+
+    resource = _REPORT_BASE + report_token
+    data = {
+        "filtered": filter_results,
+        "format": format,
+    }
+    return resource, data
+
+
+def _report_cache_key(report_token, format, filter_results):
+    return (report_token, format, filter_results, _llapi.url, _llapi.email)
+
+
+def download_report(report_token, format=None, filter_results=False, dest=None):
     """Get a CVE report as a file from the given report token
 
+    Since reports don't change, returned file data is kept in memory (up to
+    256 MB in total) and reused when the same report is requested again.
+
     Parameters
     ----------
     token : str
@@ -21,29 +51,44 @@ def download_report(report_token, format=None, filter_results=False):
         False to apply only kernel and uboot config filters, if configs have been uploaded.
         Default: False
 
+    dest : str or file object, optional
+        If given, the report is streamed to this path or binary file object
+        in chunks instead of being returned, so large files are not held in memory.
+
     Returns
     -------
     file data : bytes
-        CVE Report data in bytes from the requested file type
+        CVE Report data in bytes from the requested file type, or "dest" if it was given
     """
 
-    valid_formats = ["csv", "pdf", "pdfsummary", "xlsx"]
+    resource, data = _build_download_report(report_token, format, filter_results)
+    if dest is not None:
+        return download_to(resource, data, dest)
 
-    if not report_token:
-        raise Exception("report_token is required")
+    if _llapi.dry_run:
+        return _llapi.GET(resource, data_dict=data, json=False)
 
-    if format not in valid_formats:
-        raise Exception("Invalid or missing 'format' arg. "
-                        f"Acceptable values: {', '.join(valid_formats)}")
+    key = _report_cache_key(report_token, format, filter_results)
+    result = report_cache.get(key)
+    if result is None:
+        result = _llapi.GET(resource, data_dict=data, json=False)
+        report_cache.set(key, result)
+
+    return result
 
-    resource = f"/api/v1/vigiles/reports/{report_token}"
+
+def _build_compare_reports(token_one, token_two, remove_whitelist=False, filter_results=False):
+    if not (token_one and token_two):
+        raise Exception("Two CVE report token arguments are required for comparison")
+
+    resource = "/api/v1/vigiles/reports/compare"
     data = {
+        "token_one": token_one,
+        "token_two": token_two,
+        "remove_whitelist": remove_whitelist,
         "filtered": filter_results,
-        "format": format,
     }
-    result = timesys.llapi.GET(resource, data_dict=data, json=False)
-
-    return result
+    return resource, data
 
 
 def compare_reports(token_one, token_two, remove_whitelist=False, filter_results=False):
@@ -72,14 +117,54 @@ def compare_reports(token_one, token_two, remove_whitelist=False, filter_results
                 List new CVEs between the reports
     """
 
-    if not (token_one and token_two):
-        raise Exception("Two CVE report token arguments are required for comparison")
+    resource, data = _build_compare_reports(token_one, token_two, remove_whitelist, filter_results)
+    return _llapi.GET(resource, data)
 
-    resource = "/api/v1/vigiles/reports/compare"
-    data = {
-        "token_one": token_one,
-        "token_two": token_two,
-        "remove_whitelist": remove_whitelist,
-        "filtered": filter_results,
-    }
-    return timesys.llapi.GET(resource, data)
+
+def compare_reports_many(pairs, remove_whitelist=False, filter_results=False, max_workers=16):
+    """Compare several pairs of reports
+
+    Comparisons are made concurrently over the llapi connection pool.
+
+    All pairs are checked before any request is made, and an Exception is
+    raised if one is invalid. A failed comparison doesn't stop the others.
+    Its Exception is returned in place of its result.
+
+    Arguments
+    ---------
+    pairs : list of tuple of str
+        (token_one, token_two) pairs of CVE report tokens to compare
+    remove_whitelist : bool
+        Remove whitelisted CVEs from the reports if True
+        Default: False
+    filter_results : bool
+        Apply all filters to reports if True, else only kernel and uboot config filters if configs have been uploaded.
+        Default: False
+    max_workers : int
+        Maximum number of concurrent comparisons.
+        Default: 16
+
+    Returns
+    -------
+    list of dict or Exception
+        Result of each comparison, in the same order as "pairs", or the
+        Exception raised by comparisons which failed.
+        See "compare_reports" for details.
+    """
+
+    pairs = list(pairs)
+    for token_one, token_two in pairs:
+        _build_compare_reports(token_one, token_two)
+
+    def compare_pair(pair, **kwargs):
+        token_one, token_two = pair
+        return compare_reports(token_one, token_two, **kwargs)
+
+    return map_tokens(
+        compare_pair,
+        pairs,
+        max_workers=max_workers,
+        return_exceptions=True,
+        remove_whitelist=remove_whitelist,
+        filter_results=filter_results,
+    )